@@ -3,72 +3,378 @@
 DuckDB FastAPI Server
 
 Usage:
-  main.py [--host=<host>] [--port=<port>] [--db=<database>] [--log-level=<level>]
+  main.py [--host=<host>] [--port=<port>] [--db=<database>] [--log-level=<level>] [--tmpdir=<dir>]
+          [--threads=<n>] [--memory-limit=<size>]
 
 Options:
   --host=<host>        Host to bind the server to [default: 0.0.0.0]
   --port=<port>        Port to run the server on [default: 3000]
   --db=<database>      DuckDB database file [default: :memory:]
   --log-level=<level>  Logging level (debug, info, warning, error, critical) [default: info]
+  --tmpdir=<dir>       Directory for staging uploaded files (defaults to the system temp dir)
+  --threads=<n>        DuckDB worker threads (defaults to the number of cores)
+  --memory-limit=<size>  DuckDB memory limit, e.g. 4GB (defaults to 80% of RAM)
 
 Environment Variables:
   DUCKDB_API_HOST      Host to bind the server to
   DUCKDB_API_PORT      Port to run the server on
   DUCKDB_API_DB        DuckDB database file
   DUCKDB_API_LOG_LEVEL Logging level
+  DUCKDB_API_TMPDIR    Directory for staging uploaded files
+  DUCKDB_API_THREADS   DuckDB worker threads
+  DUCKDB_API_MEMORY_LIMIT DuckDB memory limit
 """
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Depends, Query
-from fastapi.responses import FileResponse
+from dataclasses import dataclass
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Depends, Query, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.utils import is_body_allowed_for_status_code
 from pydantic import BaseModel
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from datetime import timedelta
+from decimal import Decimal
+import duckdb
+import hashlib
 import ibis
+import io
+import orjson
+import pyarrow.csv
+import pyarrow.ipc
+import pyarrow.parquet
+import queue
+import re
+import shutil
 import tempfile
+import time
 import uvicorn
 import logging
 from docopt import docopt
 import os
-from typing import List, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Literal, Optional, Union
+
+# uvicorn[standard] installs both, except uvloop on Windows
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+try:
+    import httptools
+except ImportError:
+    httptools = None
 
 logger = logging.getLogger("uvicorn")
 
-def initialize_connection(db_file=':memory:'):
-    return ibis.connect(f"duckdb://{db_file}")
+# Plain identifiers of at most 64 characters, checked before any catalog lookup
+TABLE_NAME_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{0,63}")
+
+# Bytes per read when spooling uploads to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ExportFormat = Literal["json", "csv", "ndjson", "parquet", "arrow"]
+FORMATS = MappingProxyType({
+    "json": "application/json",
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/octet-stream",
+    "arrow": ARROW_STREAM
+})
+
+# Rows per Arrow record batch when streaming exports
+BATCH_SIZE = 100_000
+
+# Seconds a cached response stays fresh, the largest body worth caching, and
+# the most body bytes the whole cache holds at once
+CACHE_MAX_AGE = 30
+CACHE_MAX_BYTES = 8 * 1024 * 1024
+CACHE_TOTAL_BYTES = 256 * 1024 * 1024
+CACHED_PATHS = ("/tables", "/table/")
+# Functions whose result changes on every call, or that change state, so a
+# query using them is never served from the cache
+VOLATILE_FUNCTION_PATTERN = re.compile(r"\b(nextval|currval|setseed|random|uuid|gen_random_uuid)\s*\(", re.IGNORECASE)
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Server settings, resolved once from the environment, CLI arguments and defaults."""
+    host: str
+    port: int
+    db: str
+    log_level: str
+    tmpdir: Optional[str]
+    threads: Optional[int]
+    memory_limit: Optional[str]
+
+    @classmethod
+    def load(cls, args=None):
+        # Use environment variables if available, otherwise use CLI arguments, then defaults
+        args = args or {}
+        return cls(
+            host=os.getenv('DUCKDB_API_HOST') or args.get('--host') or '0.0.0.0',
+            port=int(os.getenv('DUCKDB_API_PORT') or args.get('--port') or 3000),
+            db=os.getenv('DUCKDB_API_DB') or args.get('--db') or ':memory:',
+            log_level=os.getenv('DUCKDB_API_LOG_LEVEL') or args.get('--log-level') or 'info',
+            tmpdir=os.getenv('DUCKDB_API_TMPDIR') or args.get('--tmpdir') or None,
+            threads=int(os.getenv('DUCKDB_API_THREADS') or args.get('--threads') or 0) or None,
+            memory_limit=os.getenv('DUCKDB_API_MEMORY_LIMIT') or args.get('--memory-limit') or None,
+        )
+
+class CursorPool:
+    """Reusable ibis backends over cursors of a single parent DuckDB connection.
+
+    A cursor is a child connection that shares the catalog and buffer pool, so
+    independent queries on different cursors run in parallel. Up to ``size``
+    idle cursors are kept; bursts beyond that open extra cursors that are
+    closed again when released.
+
+    Settings, temporary tables and USE belong to a cursor, so a cursor whose
+    request may have changed them is closed instead of being handed to an
+    unrelated request; such session state lasts only for that request.
+    """
+
+    def __init__(self, con, size: int):
+        self.con = con
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return ibis.duckdb.from_connection(self.con.cursor())
+
+    def release(self, db, reusable: bool = True):
+        if reusable:
+            # Don't hand a transaction left open by user SQL to the next request
+            try:
+                db.con.execute("ROLLBACK")
+            except duckdb.Error:
+                pass
+            try:
+                self.idle.put_nowait(db)
+                return
+            except queue.Full:
+                pass
+        db.con.close()
+
+def initialize_connection(db_file=':memory:', **settings):
+    # Settings apply to the whole database, so every pooled cursor shares them.
+    # The object cache keeps Parquet footers between repeated scans of a file
+    return ibis.duckdb.connect(db_file, enable_object_cache=True, **settings)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: create the database connection
-    db_file = os.getenv('DUCKDB_API_DB') or ':memory:'
-    app.state.db = initialize_connection(db_file)
+    # Startup: create the database connection. main() stores the config it
+    # resolved; when the app is served by uvicorn directly, resolve it here
+    if getattr(app.state, "config", None) is None:
+        app.state.config = Config.load()
+    config = app.state.config
+    settings = {"threads": config.threads, "memory_limit": config.memory_limit}
+    app.state.db = initialize_connection(config.db, **{k: v for k, v in settings.items() if v is not None})
+    app.state.pool = CursorPool(app.state.db.con, os.cpu_count() or 4)
     yield
     # Shutdown: close the database connection
     app.state.db.disconnect()
 
-app = FastAPI(title="DuckDB API", version="1.0.0", lifespan=lifespan)
+def json_default(value):
+    """Serialize the Arrow scalar types orjson does not handle natively."""
+    if isinstance(value, Decimal):
+        if value.as_tuple().exponent < 0:
+            return float(value)
+        # orjson only encodes integers that fit in 64 bits; wider HUGEINTs keep
+        # every digit as a string
+        return int(value) if -(1 << 63) <= value < (1 << 64) else str(value)
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, pyarrow.MonthDayNano):
+        # DuckDB INTERVALs, in seconds as DuckDB's epoch() counts them (30-day months)
+        return (value.months * 30 + value.days) * 86400 + value.nanoseconds / 1e9
+    if isinstance(value, bytes):
+        return value.decode(errors="replace")
+    return str(value)
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson instead of the standard library encoder."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+app = FastAPI(title="DuckDB API", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """Render error details with the same orjson response class as the routes."""
+    if not is_body_allowed_for_status_code(exc.status_code):
+        return Response(status_code=exc.status_code, headers=exc.headers)
+    return ORJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+@app.exception_handler(RequestValidationError)
+async def request_validation_exception_handler(request: Request, exc: RequestValidationError):
+    """Render request validation errors, such as an unknown format, with orjson too."""
+    return ORJSONResponse({"detail": jsonable_encoder(exc.errors())}, status_code=422)
+
+class ResponseCache:
+    """Short-lived in-memory copies of read responses, dropped on every write.
+
+    Both the number of entries and the total size of their bodies are capped;
+    the oldest entries are evicted first.
+    """
+
+    def __init__(self, max_age: float, max_entries: int = 512, max_bytes: int = CACHE_TOTAL_BYTES):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = {}
+        self.size = 0
+        self.generation = 0
+
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, size, response = entry
+        if expires < time.monotonic():
+            self.remove(key)
+            return None
+        return response
+
+    def put(self, key: str, response, size: int, generation: int):
+        # A write that landed while the response was produced makes it stale
+        if generation != self.generation or size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.remove(key)
+        while self.entries and (len(self.entries) >= self.max_entries or self.size + size > self.max_bytes):
+            self.remove(next(iter(self.entries)))
+        self.entries[key] = (time.monotonic() + self.max_age, size, response)
+        self.size += size
+
+    def remove(self, key: str):
+        _, size, _ = self.entries.pop(key)
+        self.size -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+        self.generation += 1
+
+response_cache = ResponseCache(CACHE_MAX_AGE)
+
+async def replay(chunks, body_iterator):
+    for chunk in chunks:
+        yield chunk
+    async for chunk in body_iterator:
+        yield chunk
+
+def is_read_query(body: bytes) -> bool:
+    """Whether an /execute request body holds a single read-only statement."""
+    try:
+        sql = orjson.loads(body).get("sql")
+    except (orjson.JSONDecodeError, AttributeError):
+        return False
+    return isinstance(sql, str) and is_read_sql(sql)
+
+def is_read_sql(sql: str) -> bool:
+    """Whether sql is a single SELECT that changes no database or session state."""
+    if VOLATILE_FUNCTION_PATTERN.search(sql):
+        return False
+    # Let DuckDB's parser classify the statement: a leading WITH may still
+    # introduce an INSERT, and every statement of a script is run
+    try:
+        statements = duckdb.extract_statements(sql)
+    except duckdb.Error:
+        return False
+    return len(statements) == 1 and statements[0].type == duckdb.StatementType.SELECT
+
+@app.middleware("http")
+async def cache_reads(request: Request, call_next):
+    """Serve repeated table reads and read-only queries from memory until the next write."""
+    # The full query string and Accept header are part of the key, so each
+    # pivot/order variant and negotiated format of an export is cached on its own
+    key = f"{request.url.path}?{request.url.query}|{request.headers.get('accept', '')}"
+    if request.method == "POST" and request.url.path == "/execute" and is_read_query(body := await request.body()):
+        # Queries are keyed on a digest of the SQL and its parameters
+        key += "|" + hashlib.blake2b(body, digest_size=16).hexdigest()
+    elif request.method != "GET" or not request.url.path.startswith(CACHED_PATHS):
+        response = await call_next(request)
+        # Even a failed request may have written: DuckDB autocommits each
+        # statement of a script before a later one errors
+        if request.method in WRITE_METHODS:
+            response_cache.clear()
+        return response
+
+    cached = response_cache.get(key)
+    if cached is not None:
+        status_code, headers, body = cached
+        return Response(body, status_code=status_code, headers=headers)
+
+    generation = response_cache.generation
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    headers = dict(response.headers)
+    chunks = []
+    size = 0
+    async for chunk in response.body_iterator:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > CACHE_MAX_BYTES:
+            # Too big to keep; pass the rest of the stream straight through
+            return StreamingResponse(replay(chunks, response.body_iterator), headers=headers)
+    body = b"".join(chunks)
+    response_cache.put(key, (response.status_code, headers, body), len(body), generation)
+    return Response(body, status_code=response.status_code, headers=headers)
+
+def validate_table_name(table_name: str):
+    """Reject table names that are not plain identifiers before they are spliced into SQL."""
+    if not TABLE_NAME_PATTERN.fullmatch(table_name):
+        raise HTTPException(status_code=400, detail=f"Invalid table name: {table_name}")
+
+def quote_identifier(name: str) -> str:
+    """Quote a column or table name for use in generated SQL."""
+    return '"' + name.replace('"', '""') + '"'
 
 def get_db(request: Request):
-    return request.app.state.db
+    # Each request checks out its own cursor, which goes back to the pool only
+    # once the response (including any streamed body) has been sent. Routes
+    # that may change its session state set request.state.discard_cursor
+    pool = request.app.state.pool
+    db = pool.acquire()
+    try:
+        yield db
+    finally:
+        pool.release(db, reusable=not getattr(request.state, "discard_cursor", False))
 
 class SQLQuery(BaseModel):
     sql: str
+    params: Optional[Union[List[Any], Dict[str, Any]]] = None
 
 class CreateTableRequest(BaseModel):
     name: str
     schema: dict
 
 @app.post("/execute", summary="Execute a SQL query")
-async def execute_query(query: SQLQuery, format: str = "json", db=Depends(get_db)):
-    """Execute a SQL query and return the results in the specified format."""
-    return export_data(query.sql, format, db)
+def execute_query(query: SQLQuery, request: Request, format: Optional[ExportFormat] = None, db=Depends(get_db)):
+    """Execute a SQL query and return the results in the specified format.
+
+    Session state set by the query (SET, USE, temporary tables) lasts only for this request.
+    """
+    if not is_read_sql(query.sql):
+        request.state.discard_cursor = True
+    return export_data(query.sql, format, db, request.headers.get("accept"), query.params)
 
 @app.get("/tables", summary="List all tables")
-async def list_tables(db=Depends(get_db)):
+def list_tables(db=Depends(get_db)):
     """Get a list of all tables in the database."""
     return {"tables": db.list_tables()}
 
 @app.get("/table/{table_name}", summary="Get table information")
-async def get_table_info(table_name: str, db=Depends(get_db)):
+def get_table_info(table_name: str, db=Depends(get_db)):
     """Get information about a specific table, including its schema."""
+    validate_table_name(table_name)
     try:
         table = db.table(table_name)
         schema = {col: str(dtype) for col, dtype in table.schema().items()}
@@ -79,39 +385,50 @@ async def get_table_info(table_name: str, db=Depends(get_db)):
 from typing import List, Optional
 
 @app.get("/table/{table_name}/export", summary="Export table data with optional pivot and order")
-async def export_table_data(
+def export_table_data(
     table_name: str,
-    format: str = Query("json", description="Export format (json, csv, ndjson, parquet)"),
+    format: Optional[ExportFormat] = Query(None, description="Export format (json, csv, ndjson, parquet, arrow); defaults to json"),
     pivot_index: Optional[List[str]] = Query(None, description="Columns to use as index for pivoting"),
     pivot_columns: Optional[str] = Query(None, description="Column to use for pivot columns"),
     pivot_values: Optional[str] = Query(None, description="Column to use for pivot values"),
     order_by: Optional[List[str]] = Query(None, description="Columns to order by"),
     ascending: bool = Query(True, description="Sort order (True for ascending, False for descending)"),
+    limit: Optional[int] = Query(None, ge=0, description="Maximum number of rows to return"),
+    offset: int = Query(0, ge=0, description="Number of rows to skip"),
+    accept: Optional[str] = Header(None),
     db=Depends(get_db)
 ):
     """
-    Export table data with optional pivot and order operations.
-    If neither pivot nor order is specified, exports the full table.
+    Export table data with optional pivot, order and limit/offset operations.
+    If none of these are specified, exports the full table.
     """
-    try:
-        table = db.table(table_name)
-        
-        # Apply pivot if pivot parameters are provided
-        if pivot_index and pivot_columns and pivot_values:
-            table = table.pivot(pivot_index, pivot_columns, pivot_values)
-        
-        # Apply order if order parameters are provided
-        if order_by:
-            table = table.order_by(order_by, ascending=ascending)
-        
-        # Export the data
-        return export_data(table.compile(), format, db)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error exporting table {table_name}: {str(e)}")
+    validate_table_name(table_name)
+
+    # Build the SQL directly rather than through an ibis expression, so DuckDB
+    # gets a single statement it can push the projection and ordering into
+    source = quote_identifier(table_name)
+    if pivot_index and pivot_columns and pivot_values:
+        index = ", ".join(quote_identifier(column) for column in pivot_index)
+        source = (
+            f"(PIVOT {source} ON {quote_identifier(pivot_columns)} "
+            f"USING first({quote_identifier(pivot_values)}) GROUP BY {index})"
+        )
+    sql = f"SELECT * FROM {source}"
+    if order_by:
+        direction = "ASC" if ascending else "DESC"
+        sql += " ORDER BY " + ", ".join(f"{quote_identifier(column)} {direction}" for column in order_by)
+    # DuckDB pushes the limit into the scan, so only the rows asked for are read
+    if limit is not None:
+        sql += f" LIMIT {limit}"
+    if offset:
+        sql += f" OFFSET {offset}"
+
+    return export_data(sql, format, db, accept)
 
 @app.post("/create_table", summary="Create a new table")
-async def create_table(request: CreateTableRequest, db=Depends(get_db)):
+def create_table(request: CreateTableRequest, db=Depends(get_db)):
     """Create a new table with the specified name and schema."""
+    validate_table_name(request.name)
     try:
         schema = ibis.schema(request.schema)
         db.create_table(request.name, schema=schema)
@@ -119,64 +436,234 @@ async def create_table(request: CreateTableRequest, db=Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def upload_path(file: UploadFile) -> Optional[str]:
+    """Return a path DuckDB can open for the upload's spooled file, if the platform has one."""
+    if not os.path.isdir("/proc/self/fd"):
+        return None
+    # fileno() rolls an in-memory spool over to its backing temp file
+    return f"/proc/self/fd/{file.file.fileno()}"
+
 @app.post("/import", summary="Import data from a file")
-async def import_data(table_name: str, file: UploadFile = File(...), db=Depends(get_db)):
+def import_data(table_name: str, request: Request, file: UploadFile = File(...), db=Depends(get_db)):
     """Import data from a file (CSV, JSON, NDJSON, or Parquet) into a new or existing table."""
+    validate_table_name(table_name)
+    file_extension = file.filename.split('.')[-1].lower()
+    if file_extension not in ['csv', 'json', 'ndjson', 'parquet']:
+        raise HTTPException(status_code=400, detail="Unsupported file format")
+
+    # On Linux DuckDB can open the upload's own spool file through /proc, so the
+    # body is never copied again
+    path = upload_path(file)
+    temp_path = None
     try:
-        file_extension = file.filename.split('.')[-1].lower()
-        if file_extension in ['csv', 'json', 'ndjson', 'parquet']:
-            db.execute(f"CREATE TABLE {table_name} AS SELECT * FROM read_{file_extension}(?, AUTO_DETECT=TRUE)", [file.file])
-            return {"message": f"Data imported to table {table_name} successfully"}
+        if path is None and file_extension == "parquet":
+            # Elsewhere pyarrow can still read a parquet upload straight from its
+            # spooled file, and DuckDB scans the resulting Arrow table in place
+            db.con.register("upload", pyarrow.parquet.read_table(file.file))
+            try:
+                db.con.execute(f"CREATE TABLE {quote_identifier(table_name)} AS SELECT * FROM upload")
+            finally:
+                db.con.unregister("upload")
         else:
-            raise HTTPException(status_code=400, detail="Unsupported file format")
+            if path is None:
+                # Spool other formats to a named file first so DuckDB can still scan
+                # them natively and in parallel, rather than through a Python file object
+                with tempfile.NamedTemporaryFile(
+                    delete=False, suffix=f".{file_extension}", dir=request.app.state.config.tmpdir
+                ) as temp_file:
+                    shutil.copyfileobj(file.file, temp_file, length=UPLOAD_CHUNK_SIZE)
+                path = temp_path = temp_file.name
+            db.con.execute(f"CREATE TABLE {quote_identifier(table_name)} AS SELECT * FROM read_{file_extension}($1)", [path])
+        return {"message": f"Data imported to table {table_name} successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if temp_path is not None:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+
+def drain(sink: io.BytesIO) -> bytes:
+    """Return the bytes written to sink so far and reset it for reuse."""
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+def needs_json_rewrite(data_type) -> bool:
+    """Whether an Arrow type is, or nests, a float or interval that to_json would misrender."""
+    if pyarrow.types.is_floating(data_type) or pyarrow.types.is_interval(data_type):
+        return True
+    return any(needs_json_rewrite(data_type.field(i).type) for i in range(data_type.num_fields))
+
+def json_value_sql(expression: str, data_type, depth: int = 0) -> str:
+    """Wrap a DuckDB expression so to_json renders its value as the API spells it.
+
+    Non-finite floats become null, since DuckDB would write bare NaN/Infinity
+    tokens, and intervals become seconds as json_default renders them. Lists,
+    maps and structs are rewritten element by element, so a value is spelled
+    the same at any depth.
+    """
+    if not needs_json_rewrite(data_type):
+        return expression
+    if pyarrow.types.is_floating(data_type):
+        return f"CASE WHEN isfinite({expression}) THEN {expression} END"
+    if pyarrow.types.is_interval(data_type):
+        return f"epoch({expression})"
+    element = f"v{depth}"
+    if pyarrow.types.is_map(data_type):
+        # Keys are left alone: to_json writes them as strings, and a map key cannot be null
+        value = json_value_sql(f"{element}.value", data_type.item_type, depth + 1)
+        return (
+            f"map_from_entries(list_transform(map_entries({expression}), "
+            f"lambda {element}: struct_pack(key := {element}.key, value := {value})))"
+        )
+    if pyarrow.types.is_list(data_type) or pyarrow.types.is_large_list(data_type) or pyarrow.types.is_fixed_size_list(data_type):
+        return f"list_transform({expression}, lambda {element}: {json_value_sql(element, data_type.value_type, depth + 1)})"
+    if pyarrow.types.is_struct(data_type):
+        fields = ", ".join(
+            f"{quote_identifier(field.name)} := "
+            + json_value_sql(f"struct_extract({expression}, '{field.name.replace(chr(39), chr(39) * 2)}')", field.type, depth)
+            for field in data_type
+        )
+        return f"CASE WHEN {expression} IS NULL THEN NULL ELSE struct_pack({fields}) END"
+    return expression
+
+def unique_names(names: List[str]) -> List[str]:
+    """Suffix repeated column names with _1, _2, ... so each becomes its own JSON key.
+
+    Names are compared case-insensitively, as DuckDB compares identifiers.
+    """
+    seen = set()
+    unique = []
+    for name in names:
+        candidate = name
+        suffix = 0
+        while candidate.lower() in seen:
+            suffix += 1
+            candidate = f"{name}_{suffix}"
+        seen.add(candidate.lower())
+        unique.append(candidate)
+    return unique
+
+def json_row_sql(schema) -> str:
+    """Build the DuckDB expression rendering a row of schema as a JSON object.
 
-def export_data(sql: str, format: str, db):
+    Columns are referenced by position (c0, c1, ...), so repeated names in a
+    join still each get a key.
+    """
+    fields = ", ".join(
+        f"{quote_identifier(name)} := {json_value_sql(f'c{i}', field.type)}"
+        for i, (field, name) in enumerate(zip(schema, unique_names(schema.names)))
+    )
+    return f"to_json(struct_pack({fields}))::VARCHAR"
+
+def encode_json_rows(renderer, data, separator: str) -> bytes:
+    """Encode each row of an Arrow table or batch as a JSON object, joined by separator.
+
+    DuckDB's native JSON writer renders every result, so a value is spelled
+    the same whatever the other columns of the result are.
+    """
+    if not data.num_columns:
+        return separator.encode().join([b"{}"] * data.num_rows)
+    positional = data.rename_columns([f"c{i}" for i in range(data.num_columns)])
+    column = renderer.from_arrow(positional).project(json_row_sql(data.schema)).to_arrow_table().column(0)
+    return separator.join(column.to_pylist()).encode()
+
+def stream_batches(reader, format: str, con=None):
+    """Encode Arrow record batches one at a time, yielding bytes as they are produced.
+
+    ndjson batches are rendered on a second cursor of con, since any query on
+    the reader's own cursor would cut it short. The cursor is opened only once
+    the body starts, so a client gone before then leaves nothing to close.
+    """
+    renderer = con.cursor() if format == "ndjson" else None
+    sink = io.BytesIO()
+    writer = None
+    if format == "arrow":
+        writer = pyarrow.ipc.new_stream(sink, reader.schema)
+    elif format == "csv":
+        writer = pyarrow.csv.CSVWriter(sink, reader.schema)
+    elif format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(sink, reader.schema)
+    try:
+        for batch in reader:
+            if writer is not None:
+                writer.write_batch(batch)
+            elif batch.num_rows:
+                sink.write(encode_json_rows(renderer, batch, "\n") + b"\n")
+            yield drain(sink)
+        if writer is not None:
+            writer.close()
+        yield drain(sink)
+    finally:
+        if renderer is not None:
+            renderer.close()
+
+def accepts_arrow_stream(accept: Optional[str]) -> bool:
+    """Whether an Accept header prefers an Arrow IPC stream to JSON."""
+    quality = {}
+    for media_range in (accept or "").split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        quality[media_type.lower()] = q
+    arrow = quality.get(ARROW_STREAM, 0.0)
+    return arrow > 0 and arrow >= quality.get(FORMATS["json"], 0.0)
+
+def export_data(sql: str, format: Optional[ExportFormat], db, accept: Optional[str] = None, params=None):
     logger.info(sql)
-    if format == "json":
-        try:
-            result = db.raw_sql(sql).fetchall()
-        except Exception as e:
-            # If both methods fail, raise an HTTP exception
-            raise HTTPException(status_code=400, detail=f"Failed to execute query: {str(e)}")
-        
-        # Return the result as-is for FastAPI to handle JSON conversion
-        return result
-
-    # For other formats, use the existing logic
-    formats = {
-        "csv": ("text/csv", "CSV, HEADER"),
-        "ndjson": ("application/x-ndjson", "JSON"),
-        "parquet": ("application/octet-stream", "PARQUET")
-    }
-    if format not in formats:
-        raise HTTPException(status_code=400, detail="Unsupported export format")
-    
-    media_type, duckdb_format = formats[format]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{format}") as temp_file:
-        try:
-            db.raw_sql(f"COPY ({sql}) TO '{temp_file.name}' (FORMAT {duckdb_format})")
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Failed to export data: {str(e)}")
-        return FileResponse(temp_file.name, media_type=media_type, filename=f"result.{format}")
+    # An explicit format wins; otherwise columnar clients asking for an Arrow
+    # stream get the record batches as-is
+    if format is None:
+        format = "arrow" if accepts_arrow_stream(accept) else "json"
+
+    try:
+        if format == "json":
+            result = db.con.execute(sql, params).to_arrow_table()
+            return Response(b"[" + encode_json_rows(db.con, result, ",") + b"]", media_type=FORMATS[format])
+        # Stream other formats batch by batch; the request's cursor is not reused
+        # by anything else, so the reader stays valid while the response is sent
+        reader = db.con.execute(sql, params).to_arrow_reader(BATCH_SIZE)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to execute query: {str(e)}")
+    return StreamingResponse(
+        stream_batches(reader, format, db.con),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="result.{format}"'}
+    )
+
+def main():
+    config = Config.load(docopt(__doc__))
+    app.state.config = config
+
+    log_level = getattr(logging, config.log_level.upper())
 
-if __name__ == "__main__":
-    args = docopt(__doc__)
-    
-    # Use environment variables if available, otherwise use CLI arguments, then defaults
-    host = os.getenv('DUCKDB_API_HOST') or args['--host'] or '0.0.0.0'
-    port = int(os.getenv('DUCKDB_API_PORT') or args['--port'] or 3000)
-    db_file = os.getenv('DUCKDB_API_DB') or args['--db'] or ':memory:'
-    log_level_str = os.getenv('DUCKDB_API_LOG_LEVEL') or args['--log-level'] or 'info'
-    
-    log_level = getattr(logging, log_level_str.upper())
-    
     logging.basicConfig(level=log_level)
     logger.setLevel(log_level)
 
-    logger.info(f"Starting server on {host}:{port}")
-    logger.info(f"Using database file: {db_file}")
-    logger.info(f"Log level set to: {log_level_str}")
+    logger.info(f"Starting server on {config.host}:{config.port}")
+    logger.info(f"Using database file: {config.db}")
+    logger.info(f"Log level set to: {config.log_level}")
 
-    uvicorn.run(app, host=host, port=port, log_level=log_level_str.lower())
\ No newline at end of file
+    # uvloop and httptools replace the pure-Python asyncio loop and h11 parser;
+    # the per-request access log line is skipped on the data-serving path
+    uvicorn.run(
+        app,
+        host=config.host,
+        port=config.port,
+        loop="uvloop" if uvloop else "asyncio",
+        http="httptools" if httptools else "h11",
+        access_log=False,
+        log_level=config.log_level.lower()
+    )
+
+if __name__ == "__main__":
+    main()